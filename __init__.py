@@ -10,8 +10,18 @@ bl_info = {
 }
 
 
-import importlib, bpy, time
-from .operators import display_error_message
+if "bpy" in locals(): # Add-on is being reloaded, refresh the already imported submodules
+    import importlib
+    # Dependency order, not registration order, properties and ui import names from operators
+    # and would otherwise keep pointing at the old module's functions and caches
+    for mod in (operators, properties, ui):
+        importlib.reload(mod)
+else:
+    from . import properties, operators, ui
+
+import bpy
+from functools import partial
+from time import monotonic_ns
 
 
 ################################################################################################################
@@ -19,23 +29,68 @@ from .operators import display_error_message
 ################################################################################################################
 
 
-old_time = 0
-@bpy.app.handlers.persistent
-def screenshot_save_handler(scene) -> None:
-    '''Handles saving screenshots whenever the file is saved'''
-    global old_time
+RENDER_BUFFER_NS = 30_000_000_000 # Minimum time between save renders
+
+last_render_time = None
+def render_enabled_screenshots() -> None:
+    '''Timer callback that renders all enabled screenshots after a save'''
+    global last_render_time
     scene = bpy.context.scene
 
-    if scene.screenshot_saver.record_on_save:
-        if not len(scene.scrshot_camera_coll):
-            display_error_message(message='Could not render because no screenshot cameras exist.') # Send this before saving
-            return None
+    # Recording could have been stopped or all cameras removed while waiting
+    if not (scene.screenshot_saver.record_on_save and scene.scrshot_camera_coll):
+        return None
+
+    # A manual batch started since the save, try again once it's done with the scene
+    if operators.SCRSHOT_OT_render_screenshots.rendering:
+        return 1.0
 
-        # Render buffer when saving more than one time every 30 seconds
-        if time.time() - old_time > 30:
-            bpy.ops.scrshot.render_screenshots(render_type='enabled')
+    override = operators.get_view3d_override()
+    if override is None:
+        return None
 
-            old_time = time.time()
+    bpy.ops.scrshot.render_screenshots(override, render_type='enabled')
+
+    last_render_time = monotonic_ns()
+    return None
+
+
+@bpy.app.handlers.persistent
+def screenshot_save_handler(dummy) -> None:
+    '''Handles saving screenshots whenever the file is saved'''
+    # save_post doesn't pass a scene (only None or the file path). The handler stays
+    # installed, as Record on Save also changes through undo/redo and appended scenes
+    # where no update callback runs, so not recording only costs this early out
+    scene = bpy.context.scene
+    if not scene.screenshot_saver.record_on_save:
+        return None
+
+    if not scene.scrshot_camera_coll:
+        # Shown on the next event loop tick so the save isn't held up by the popup
+        bpy.app.timers.register(
+            partial(operators.display_error_message, message='Could not render because no screenshot cameras exist.'),
+            first_interval=0
+        )
+        return None
+
+    # A trailing render is already queued, it will pick up this save as well
+    if bpy.app.timers.is_registered(render_enabled_screenshots):
+        return None
+
+    # The scene is mid batch (temporary shading, cameras & visibility), don't queue on top of it
+    if operators.SCRSHOT_OT_render_screenshots.rendering:
+        return None
+
+    # Render buffer when saving more than one time every 30 seconds, the
+    # last save of a burst gets rendered once the buffer runs out
+    #
+    # Rendering is always deferred to a timer so the save finishes
+    # (and the UI redraws) before any screenshot is taken
+    if last_render_time is None:
+        wait_ns = 0
+    else:
+        wait_ns = max(RENDER_BUFFER_NS - (monotonic_ns() - last_render_time), 0)
+    bpy.app.timers.register(render_enabled_screenshots, first_interval=wait_ns / 1e9)
 
 
 ################################################################################################################
@@ -43,30 +98,37 @@ def screenshot_save_handler(scene) -> None:
 ################################################################################################################
 
 
-module_names = (
-    "ui",
-    "operators",
-    "properties"
+# Properties register first so the operators and panels that read them never see a half registered add-on
+modules = (
+    properties,
+    operators,
+    ui
 )
 
-modules = []
-for module_name in module_names:
-    if module_name in locals():
-        modules.append(importlib.reload(locals()[module_name]))
-    else:
-        modules.append(importlib.import_module("." + module_name, package=__package__))
-
 def register():
+    # Nobody is around to see screenshots in background mode (blender -b)
+    if bpy.app.background:
+        return
+
     for mod in modules:
         mod.register()
 
-    bpy.app.handlers.save_post.append(screenshot_save_handler)
+    # Guard against stacking handlers, every duplicate would render again on save
+    if screenshot_save_handler not in bpy.app.handlers.save_post:
+        bpy.app.handlers.save_post.append(screenshot_save_handler)
 
 def unregister():
-    for mod in modules:
+    if bpy.app.background:
+        return
+
+    for mod in reversed(modules):
         mod.unregister()
 
-    bpy.app.handlers.save_post.remove(screenshot_save_handler)
+    if screenshot_save_handler in bpy.app.handlers.save_post:
+        bpy.app.handlers.save_post.remove(screenshot_save_handler)
+
+    if bpy.app.timers.is_registered(render_enabled_screenshots):
+        bpy.app.timers.unregister(render_enabled_screenshots)
 
 
 # ##### BEGIN GPL LICENSE BLOCK #####
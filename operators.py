@@ -1,4 +1,7 @@
-import bpy, os, json, time, subprocess
+import bpy, os, re, json, time, struct, subprocess
+from math import pi, tau, degrees
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from bpy.types import Operator
 from .pillow import Image
 from .exr_parse.parse_metadata import read_exr_header
@@ -9,6 +12,17 @@ log = logging.getLogger(__name__)
 if "PYDEVD_USE_FRAME_EVAL" in os.environ: # If using the Python Dev add-on for blender, set config to debug... works sometimes
     logging.basicConfig(level='DEBUG')
 
+# Add-on root path, bundled ffmpeg & temp file paths
+ADDON_PATH = Path(os.path.abspath(__file__)).parent
+FFMPEG_PATH = Path(ADDON_PATH, "ffmpeg", "bin", "ffmpeg.exe")
+TEMP_PATH = Path(ADDON_PATH, "temp")
+SCRSHOT_COPY_PATH = Path(TEMP_PATH, "latest_screenshot_copy.json")
+CONCAT_PATH = Path(TEMP_PATH, "concat.txt")
+PALETTE_PATH = Path(TEMP_PATH, "palette.png")
+
+# Latest copied screenshot settings, SCRSHOT_COPY_PATH only gets read when this is empty (new session)
+scrshot_clipboard = {}
+
 
 ################################################################################################################
 # FUNCTIONS & MIX-IN
@@ -19,22 +33,102 @@ def active_screenshot_exists() -> bool:
     '''Poll for the active screenshot item'''
     scene = bpy.context.scene
 
-    if not len(scene.scrshot_camera_coll):
-        return False
-    elif (scene.scrshot_camera_index + 1) > len(scene.scrshot_camera_coll):
-        return False
-    return True
+    # Same range as indexing the collection, deleting the first item leaves the index at -1
+    count = len(scene.scrshot_camera_coll)
+    return -count <= scene.scrshot_camera_index < count
+
 
+# (absolute export path, exists, time checked) of the last check, panels and polls ask on every redraw
+export_path_cache = (None, False, 0.0)
+
+EXPORT_PATH_RECHECK_INTERVAL = 0.5 # Seconds, picks up folders created or removed outside of Blender
 
 def export_path_exists() -> bool:
-    '''Poll for if the export path exists'''
+    '''Poll for if the export path exists, only checked on disk when the path changes or the last check is stale'''
+    global export_path_cache
     export_path = bpy.context.scene.screenshot_saver.export_path
+    abs_export_path = bpy.path.abspath(export_path)
+
+    cached_path, exists, checked_time = export_path_cache
+    now = time.monotonic()
+    if abs_export_path != cached_path or now - checked_time > EXPORT_PATH_RECHECK_INTERVAL:
+        exists = export_path == '//screenshots' or os.path.exists(abs_export_path)
+        export_path_cache = (abs_export_path, exists, now)
+    return exists
+
+
+def invalidate_export_path_cache() -> None:
+    '''Force the next export_path_exists call to check the disk again'''
+    global export_path_cache
+    export_path_cache = (None, False, 0.0)
+
+
+def detach_value(value):
+    '''Arrays (vectors, colors) are live views of their data, return a copy that won't change along with it'''
+    if hasattr(value, '__len__') and not isinstance(value, str):
+        return tuple(value)
+    return value
+
+
+def set_if_changed(data, attr: str, value) -> None:
+    '''Only write a property that differs, some RNA setters tag updates even when given the current value'''
+    if getattr(data, attr) != value:
+        setattr(data, attr, value)
+
 
-    if not os.path.exists(bpy.path.abspath(export_path)) and export_path != '//screenshots':
+def get_view3d_override() -> dict:
+    '''Find a 3D Viewport to run operators in when the current context has none (timers, handlers)'''
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type != 'VIEW_3D':
+                continue
+
+            for region in area.regions:
+                if region.type == 'WINDOW':
+                    return {'window': window, 'screen': window.screen, 'area': area, 'region': region}
+    return None
+
+
+def ensure_camera_view(region_3d) -> bool:
+    '''Switch the viewport into camera view if it isn't already, returns whether a switch happened'''
+    if region_3d.view_perspective == 'CAMERA':
         return False
+
+    bpy.ops.view3d.view_camera() # Override the context if method changes. Changing the view "manually" has issues
     return True
 
 
+def deselect_all_objects(context) -> None:
+    '''Deselect every object in one C-side operator call, falling back to a loop where it can't run (e.g. Edit Mode)'''
+    if bpy.ops.object.select_all.poll():
+        bpy.ops.object.select_all(action='DESELECT')
+        return
+
+    for ob in context.selected_objects:
+        ob.select_set(False)
+
+
+def capture_studio_light(shading, active_scrshot, mode: str) -> None:
+    '''Store the viewport's current studio light, matcap or HDRi ('studio', 'matcap', 'eevee') name on the screenshot item'''
+    saved_shading_type = shading.type
+    saved_shading_light = shading.light
+
+    if mode == 'studio':
+        shading.type = 'SOLID'
+        shading.light = 'STUDIO'
+        active_scrshot.studio_light_name = shading.studio_light
+    elif mode == 'matcap':
+        shading.type = 'SOLID'
+        shading.light = 'MATCAP'
+        active_scrshot.matcap_light_name = shading.studio_light
+    elif mode == 'eevee':
+        shading.type = 'MATERIAL'
+        active_scrshot.eevee_light_name = shading.studio_light
+
+    shading.type = saved_shading_type
+    shading.light = saved_shading_light
+
+
 def display_error_message(message='', title='Screenshot Saver Warning', icon='ERROR') -> None:
     '''Display a custom error message in situations where a regular error message cannot be sent'''
     def draw(self, context):
@@ -69,6 +163,71 @@ class SCRSHOT_OT_open_folder(OpInfo, Operator):
 
 ### RENDER OPS ###
 
+# Every setting the render operator modifies, saved beforehand and restored afterwards
+#
+# Ordered so that "mode" settings are restored before the settings whose
+# valid values depend on them (studio_light on type/light, color_depth on file_format)
+SAVED_SHADING_ATTRS = (
+    'type', 'light', 'color_type', 'studio_light', 'studiolight_rotate_z', 'use_world_space_lighting',
+    'show_backface_culling', 'show_object_outline', 'object_outline_color', 'show_specular_highlight',
+    'show_cavity', 'cavity_type', 'cavity_ridge_factor', 'cavity_valley_factor', 'curvature_ridge_factor', 'curvature_valley_factor',
+    'use_scene_lights', 'use_scene_world', 'use_studiolight_view_rotation',
+    'studiolight_intensity', 'studiolight_background_alpha', 'studiolight_background_blur',
+    'use_dof', 'show_xray', 'show_shadows'
+)
+SAVED_RENDER_ATTRS = (
+    'engine', 'filepath', 'resolution_x', 'resolution_y',
+    'use_file_extension', 'use_render_cache', 'use_overwrite', 'use_placeholder'
+)
+SAVED_IMAGE_SETTINGS_ATTRS = ('file_format', 'color_mode', 'color_depth')
+
+# (RNA struct type, attrs) -> the attrs that struct actually has and can write, filled on first use
+saveable_attrs_cache = {}
+
+def get_saveable_attrs(data, attrs: tuple) -> tuple:
+    '''Filter attrs down to the writable properties of data, only looked up in bl_rna once per struct type'''
+    key = (type(data), attrs)
+    if key not in saveable_attrs_cache:
+        properties = data.bl_rna.properties
+        saveable_attrs_cache[key] = tuple(
+            attr for attr in attrs if attr in properties and not properties[attr].is_readonly
+        )
+    return saveable_attrs_cache[key]
+
+# Screenshot item enum identifiers -> Blender's own enum identifiers
+SHADING_LIGHT_TYPES = {'studio': 'STUDIO', 'matcap': 'MATCAP', 'flat': 'FLAT'}
+SHADING_COLOR_TYPES = {
+    'material': 'MATERIAL', 'single': 'SINGLE', 'object': 'OBJECT',
+    'random': 'RANDOM', 'vertex': 'VERTEX', 'texture': 'TEXTURE'
+}
+IMAGE_FILE_FORMATS = {'png': 'PNG', 'jpeg': 'JPEG', 'open_exr': 'OPEN_EXR'}
+
+# (viewport shading attribute, screenshot item attribute) pairs that are loaded as-is
+WORKBENCH_SHADING_MAP = (
+    ('show_backface_culling', 'use_backface_culling'),
+    ('show_object_outline', 'use_outline'),
+    ('show_cavity', 'use_cavity'),
+    ('show_specular_highlight', 'use_spec_lighting'),
+    ('cavity_ridge_factor', 'cavity_ridge'),
+    ('cavity_valley_factor', 'cavity_valley'),
+    ('curvature_ridge_factor', 'curve_ridge'),
+    ('curvature_valley_factor', 'curve_valley'),
+    ('object_outline_color', 'outliner_color_value')
+)
+EEVEE_SHADING_MAP = (
+    ('use_scene_lights', 'use_scene_lights'),
+    ('use_scene_world', 'use_scene_world'),
+    ('studio_light', 'eevee_light_name'),
+    ('use_studiolight_view_rotation', 'eevee_use_rotate'),
+    ('studiolight_rotate_z', 'studio_rotate_z'),
+    ('studiolight_intensity', 'eevee_intensity'),
+    ('studiolight_background_alpha', 'eevee_alpha'),
+    ('studiolight_background_blur', 'eevee_blur')
+)
+
+# Rendered screenshots are named "<screenshot name>_<counter>.<extension>"
+FILE_COUNTER_PATTERN = re.compile(r'(.+)_(\d+)\.(\w+)$')
+
 class SCRSHOT_OT_render_screenshots(OpInfo, Operator):
     """The core operator for taking and rendering screenshots"""
     bl_idname = "scrshot.render_screenshots"
@@ -83,35 +242,53 @@ class SCRSHOT_OT_render_screenshots(OpInfo, Operator):
         options={'HIDDEN'}
     )
 
+    # Set while a modal batch is running, the scene is in its temporary screenshot state until it ends
+    rendering = False
+
     @classmethod
     def poll(cls, context):
-        return active_screenshot_exists() and export_path_exists()
+        # Polled on every redraw, the export path is only checked on disk once rendering starts
+        return not cls.rendering and active_screenshot_exists() and bool(context.scene.screenshot_saver.export_path)
 
-    def get_set_hidden_objects(self, context) -> dict:
-        '''Generate a dict of all objects and collections that will be hidden for the viewport render and hide them'''
+    def get_set_hidden_objects(self, context) -> tuple:
+        '''Save the visibility of all objects and collections and hide the ones that are hidden in renders'''
         vlayer = context.view_layer
-        
-        def layer_traverse(coll, layer=vlayer.layer_collection) -> bpy.types.LayerCollection:
-            '''Traverse all layer collections to find the matching one'''
-            if layer.collection == coll:
-                yield {'layer_ob': layer, 'layer_vis': layer.hide_viewport}
 
+        # Map each collection to its layer collection in one walk of the tree,
+        # the first match wins for collections linked in more than one place
+        layer_colls = {}
+        def layer_traverse(layer) -> None:
+            '''Traverse all layer collections below the given one'''
             for child in layer.children:
-                yield from layer_traverse(coll, child)
+                layer_colls.setdefault(child.collection, child)
+                layer_traverse(child)
+
+        layer_traverse(vlayer.layer_collection)
+
+        # Object flags are read in bulk, one C call per property instead of one per object
+        objects = vlayer.objects
+        render_hidden = [False] * len(objects)
+        viewport_hidden = [False] * len(objects)
+        objects.foreach_get('hide_render', render_hidden)
+        objects.foreach_get('hide_viewport', viewport_hidden)
+
+        # hide_get/hide_set work on the view layer's bases and can't be batched, only
+        # touch the objects that actually need unhiding
+        layer_unhidden = [ob for ob, hidden in zip(objects, render_hidden) if not hidden and ob.hide_get()]
+
+        # Written per object as foreach_set skips the hide_viewport update (base flag sync &
+        # depsgraph tag), only the objects whose viewport visibility differs get touched though
+        viewport_changed = [
+            (ob, viewport) for ob, render, viewport in zip(objects, render_hidden, viewport_hidden) if render != viewport
+        ]
 
-        ob_hide_states = {ob:{
-                    'render_vis': ob.hide_render,
-                    'viewport_vis': ob.hide_viewport,
-                    'layer_vis': ob.hide_get()
-                }
-            for ob in vlayer.objects
-        }
+        ob_hide_states = (viewport_changed, layer_unhidden)
         coll_hide_states = {coll:{
                     'render_vis': coll.hide_render,
                     'viewport_vis': coll.hide_viewport,
-                    'layer': next(layer_traverse(coll))
+                    'layer': {'layer_ob': layer, 'layer_vis': layer.hide_viewport}
                 }
-            for coll in bpy.data.collections
+            for coll, layer in layer_colls.items()
         }
 
         # Leave local view if currently used
@@ -123,15 +300,15 @@ class SCRSHOT_OT_render_screenshots(OpInfo, Operator):
                         self.local_view = True
                         self.report_string = 'Local View exited to render'
 
+                        # Legacy dict override, context.temp_override needs Blender 3.2+
                         override = {'area': area, 'region': region}
                         bpy.ops.view3d.localview(override)
+                        break # Once per area, quad view has several WINDOW regions
 
-        for ob, vis in ob_hide_states.items():
-            if vis['render_vis']:
-                ob.hide_viewport = True
-            else:
-                ob.hide_viewport = False
-                ob.hide_set(False)
+        for ob, viewport in viewport_changed:
+            ob.hide_viewport = not viewport
+        for ob in layer_unhidden:
+            ob.hide_set(False)
 
         for coll, vis in coll_hide_states.items():
             if vis['render_vis']:
@@ -159,23 +336,24 @@ class SCRSHOT_OT_render_screenshots(OpInfo, Operator):
         overlay = self.space_data.overlay
         scene = context.scene
 
-        # Use dir() to save every entry in the UI
+        # Only save what gets modified, see SAVED_*_ATTRS when adding new settings
         #
-        # This will end up saving a lot of unnecessary data, but is very
-        # modular compared to saving everything we need individually
-        self.saved_settings = {}
-
-        for data in (shading, scene.render, scene.render.image_settings, scene.display, scene.eevee):
-            for attr in dir(data):
-                if data not in self.saved_settings:
-                    self.saved_settings[data] = {}
-
-                self.saved_settings[data][attr] = getattr(data, attr)
-
-        # Manual dict values (only for when we need to cherry pick one or two values from each "group")
-        self.saved_settings[overlay] = {'show_overlays': overlay.show_overlays}
-        #self.saved_settings[scene] = {'camera': scene.camera} # not working, do manually
-        self.saved_settings[scene] = {'frame_current': scene.frame_current}
+        # Stored flat as (data, attribute, value) so restoring is a single loop
+        self.saved_settings = [
+            (data, attr, detach_value(getattr(data, attr)))
+            for data, saved_attrs in (
+                (shading, SAVED_SHADING_ATTRS),
+                (scene.render, SAVED_RENDER_ATTRS),
+                (scene.render.image_settings, SAVED_IMAGE_SETTINGS_ATTRS),
+                # Manual values (only for when we need to cherry pick one or two values from each "group")
+                (scene.display, ('viewport_aa',)),
+                (scene.eevee, ('taa_samples',)),
+                (scene.display_settings, ('display_device',)),
+                (overlay, ('show_overlays',)),
+                (scene, ('frame_current',)) # camera is not working this way, done manually
+            )
+            for attr in get_saveable_attrs(data, saved_attrs)
+        ]
 
         # Manual camera sync
         self.saved_camera = scene.camera
@@ -187,24 +365,23 @@ class SCRSHOT_OT_render_screenshots(OpInfo, Operator):
         if self.saved_area_type is not None:
             context.area.type = self.saved_area_type
 
-        # Original shading, overlay, file path, etc settings
-        self.saved_settings_overflow = {}
-        for key, values in self.saved_settings.items():
-            for name, value in dict(values).items(): # dict() is unecessary but syntax is missing otherwise
-                try:
-                    setattr(key, name, value)
-                except AttributeError: # read_only attr
-                    pass
-                except TypeError: # This seems to only happen with color depth (bad context), keep debug log for future exceptions
-                    log.debug(f'{name}: {value} had a TypeError, this should be normal.')
+        # Original shading, overlay, file path, etc settings. Most of them are left
+        # untouched by a render (especially single ones), those don't need writing back
+        for data, name, value in self.saved_settings:
+            try:
+                set_if_changed(data, name, value)
+            except TypeError: # Enum value not available in the restored context, keep debug log for future exceptions
+                log.debug(f'{name}: {value} had a TypeError, this should be normal.')
 
         # Manual camera sync
-        context.scene.camera = self.saved_camera
+        set_if_changed(context.scene, 'camera', self.saved_camera)
 
         # Unhide objects/collections hidden in the viewport
-        for ob, vis in ob_hide_states.items():
-            ob.hide_viewport = vis['viewport_vis']
-            ob.hide_set(vis['layer_vis'])
+        viewport_changed, layer_unhidden = ob_hide_states
+        for ob, viewport in viewport_changed:
+            ob.hide_viewport = viewport
+        for ob in layer_unhidden:
+            ob.hide_set(True)
 
         for coll, vis in coll_hide_states.items():
             coll.hide_viewport = vis['viewport_vis']
@@ -214,7 +391,54 @@ class SCRSHOT_OT_render_screenshots(OpInfo, Operator):
         if self.switch_cam:
             bpy.ops.view3d.view_camera()
 
-    def handle_user_settings(self, context, active_scrshot) -> None:
+    def scan_file_counters(self, directory: Path, file_format: str) -> dict:
+        '''Get the highest counter of every screenshot rendered to a directory in the given format'''
+        counters = {}
+        suffix = f'.{file_format}'
+
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                # Cheap extension check first, folders mix formats when the format type gets changed
+                if not entry.name.endswith(suffix):
+                    continue
+
+                match = FILE_COUNTER_PATTERN.match(entry.name)
+                if match is None or not entry.is_file():
+                    continue
+
+                base_name, counter = match.group(1), int(match.group(2))
+                counters[base_name] = max(counters.get(base_name, 0), counter)
+        return counters
+
+    def get_file_counter(self, directory: Path, name: str, file_format: str) -> int:
+        '''Get the next free counter for a screenshot file, each directory is only scanned once per render'''
+        if directory not in self.file_counters:
+            # Created here so the folder is only touched once per batch as well,
+            # parents covers nested subfolder names ("turntables/close_ups")
+            directory.mkdir(parents=True, exist_ok=True)
+
+            self.file_counters[directory] = self.scan_file_counters(directory, file_format)
+
+        counters = self.file_counters[directory]
+        counters[name] = counters.get(name, 0) + 1
+        return counters[name]
+
+    def set_shading(self, attr: str, value) -> None:
+        '''Set a viewport shading attribute, skipped if a previous screenshot already set the same value'''
+        value = detach_value(value)
+
+        applied_shading = self.applied_shading
+        if attr in applied_shading and applied_shading[attr] == value:
+            return
+
+        setattr(self.space_data.shading, attr, value)
+        applied_shading[attr] = value
+
+        # studio_light points to a different list of lights for each type/light
+        if attr in {'type', 'light'}:
+            applied_shading.pop('studio_light', None)
+
+    def handle_user_settings(self, context, active_scrshot, export_path: str) -> None:
         '''Load per screenshot settings such as file pathing, resolution and render setups'''
         def handle_path_formatting(file_path: str) -> str:
             # Extend folder path if using subfolders
@@ -224,29 +448,12 @@ class SCRSHOT_OT_render_screenshots(OpInfo, Operator):
                 path_end = active_scrshot.name
             
             file_path = Path(file_path, path_end)
-            file_path.parent.mkdir(exist_ok=True)
-
-            scene.frame_current = active_scrshot.render_frame
-
-            # Get the file extension type
-            if scene.screenshot_saver.format_type == 'open_exr':
-                file_format = 'exr'
-            else: # PNG, JPEG
-                file_format = scene.screenshot_saver.format_type
 
-            file_numbers = []
-            for filename in os.listdir(file_path.parent):
-                try:
-                    if Path(file_path.parent, filename).is_file():
-                        file_numbers.append(int(filename.split('_')[-1].split(f'.{file_format}')[0]))
-                except ValueError:
-                    pass
+            set_if_changed(scene, 'frame_current', active_scrshot.render_frame)
 
             # Set the counter & format the path end with 4 digit suffix
-            if not len(file_numbers):
-                counter = 1
-            else:
-                counter = max(file_numbers)+1
+            file_format = self.file_format
+            counter = self.get_file_counter(file_path.parent, file_path.name, file_format)
 
             file_path = str(file_path) + '_{:04d}'.format(counter)
 
@@ -254,123 +461,139 @@ class SCRSHOT_OT_render_screenshots(OpInfo, Operator):
 
         scene = context.scene
         render = scene.render
-        shading = self.space_data.shading
+        set_shading = self.set_shading
 
-        render.filepath = handle_path_formatting(bpy.path.abspath(scene.screenshot_saver.export_path))
+        render.filepath = handle_path_formatting(export_path)
 
-        scene.camera = active_scrshot.camera_ob
+        set_if_changed(scene, 'camera', active_scrshot.camera_ob)
 
-        render.resolution_x = active_scrshot.cam_res_x
-        render.resolution_y = active_scrshot.cam_res_y
+        set_if_changed(render, 'resolution_x', active_scrshot.cam_res_x)
+        set_if_changed(render, 'resolution_y', active_scrshot.cam_res_y)
 
         if active_scrshot.render_type == 'workbench':
-            shading.type = 'SOLID'
+            set_shading('type', 'SOLID')
 
             if active_scrshot.use_defaults:
                 return
 
-            shading.light = str(active_scrshot.lighting_type).upper()
+            set_shading('light', SHADING_LIGHT_TYPES[active_scrshot.lighting_type])
 
             if active_scrshot.lighting_type == 'studio':
-                shading.use_world_space_lighting = active_scrshot.use_wsl
-                shading.studiolight_rotate_z = active_scrshot.studio_rotate_z
-                shading.studio_light = active_scrshot.studio_light_name
+                set_shading('use_world_space_lighting', active_scrshot.use_wsl)
+                set_shading('studiolight_rotate_z', active_scrshot.studio_rotate_z)
+                set_shading('studio_light', active_scrshot.studio_light_name)
             elif active_scrshot.lighting_type == 'matcap':
-                shading.studio_light = active_scrshot.matcap_light_name
+                set_shading('studio_light', active_scrshot.matcap_light_name)
 
-            shading.show_backface_culling = active_scrshot.use_backface_culling
-            shading.show_object_outline = active_scrshot.use_outline
-            shading.show_cavity = active_scrshot.use_cavity
-            shading.show_specular_highlight = active_scrshot.use_spec_lighting
+            set_shading('cavity_type', 'BOTH')
 
-            shading.cavity_type = 'BOTH'
-            shading.cavity_ridge_factor = active_scrshot.cavity_ridge
-            shading.cavity_valley_factor = active_scrshot.cavity_valley
-            shading.curvature_ridge_factor = active_scrshot.curve_ridge
-            shading.curvature_valley_factor = active_scrshot.curve_valley
+            for shading_attr, scrshot_attr in WORKBENCH_SHADING_MAP:
+                set_shading(shading_attr, getattr(active_scrshot, scrshot_attr))
 
-            shading.object_outline_color = active_scrshot.outliner_color_value
-
-            shading.color_type = str(active_scrshot.color_type).upper()
+            set_shading('color_type', SHADING_COLOR_TYPES[active_scrshot.color_type])
         else: # EEVEE
-            render.engine = 'BLENDER_EEVEE'
-            shading.type = 'MATERIAL'
+            set_if_changed(render, 'engine', 'BLENDER_EEVEE')
+            set_shading('type', 'MATERIAL')
 
             if active_scrshot.use_defaults:
                 return
 
-            shading.use_scene_lights = active_scrshot.use_scene_lights
-            shading.use_scene_world = active_scrshot.use_scene_world
-
-            shading.studio_light = active_scrshot.eevee_light_name
-
-            shading.use_studiolight_view_rotation = active_scrshot.eevee_use_rotate
-            shading.studiolight_rotate_z = active_scrshot.studio_rotate_z
-            shading.studiolight_intensity = active_scrshot.eevee_intensity
-            shading.studiolight_background_alpha = active_scrshot.eevee_alpha
-            shading.studiolight_background_blur = active_scrshot.eevee_blur
+            for shading_attr, scrshot_attr in EEVEE_SHADING_MAP:
+                set_shading(shading_attr, getattr(active_scrshot, scrshot_attr))
 
     def handle_misc_sett(self, context) -> None:
         '''Set a handful of render/scene settings that are maintained across all screenshot renders'''
         scene = context.scene
         render = scene.render
-        shading = self.space_data.shading
+        space_data = self.space_data
+        shading = space_data.shading
         image_settings = render.image_settings
+        format_type = scene.screenshot_saver.format_type
+
+        set_if_changed(scene.display, 'viewport_aa', 'FXAA')
+        set_if_changed(scene.eevee, 'taa_samples', 16)
+
+        set_if_changed(space_data.overlay, 'show_overlays', False)
+
+        set_if_changed(shading, 'use_dof', False)
+        set_if_changed(shading, 'show_xray', False)
+        set_if_changed(shading, 'show_shadows', False)
+
+        set_if_changed(image_settings, 'color_mode', 'RGB')
+        set_if_changed(scene.display_settings, 'display_device', 'sRGB')
+
+        set_if_changed(render, 'use_file_extension', True)
+        set_if_changed(render, 'use_render_cache', False)
+        set_if_changed(render, 'use_overwrite', True)
+        set_if_changed(render, 'use_placeholder', False)
+
+        self.switch_cam = ensure_camera_view(space_data.region_3d)
+
+        set_if_changed(image_settings, 'file_format', IMAGE_FILE_FORMATS[format_type])
+        if format_type != 'jpeg':
+            set_if_changed(image_settings, 'color_depth', '16')
+
+    @staticmethod
+    def render_group_key(scrshot) -> tuple:
+        '''Sort key that puts screenshots sharing the same shading setup (down to the light) next to each other'''
+        if scrshot.render_type == 'eevee':
+            return (not scrshot.use_defaults, 'eevee', '', scrshot.eevee_light_name)
+        if scrshot.lighting_type == 'studio':
+            light_name = scrshot.studio_light_name
+        elif scrshot.lighting_type == 'matcap':
+            light_name = scrshot.matcap_light_name
+        else: # Flat
+            light_name = ''
+        return (not scrshot.use_defaults, 'workbench', scrshot.lighting_type, light_name)
+
+    def get_rendered_screenshots(self, context) -> list:
+        '''Get the screenshots to render and set up the state shared between them'''
+        scene = context.scene
+        scrshot_saver = scene.screenshot_saver
 
-        scene.display.viewport_aa = 'FXAA'
-        scene.eevee.taa_samples = 16
-
-        self.space_data.overlay.show_overlays = False
-
-        shading.use_dof = False
-        shading.show_xray = False
-        shading.show_shadows = False
-
-        image_settings.color_mode = 'RGB'
-        scene.display_settings.display_device = 'sRGB'
-
-        render.use_file_extension = True
-        render.use_render_cache = False
-        render.use_overwrite = True
-        render.use_placeholder = False
+        self.export_path = bpy.path.abspath(scrshot_saver.export_path)
+        self.file_counters = {}
+        self.applied_shading = {}
 
-        if context.space_data.region_3d.view_perspective != 'CAMERA':
-            self.switch_cam = True
-            bpy.ops.view3d.view_camera()
-        else:
-            self.switch_cam = False
+        # Get the file extension type
+        self.file_format = 'exr' if scrshot_saver.format_type == 'open_exr' else scrshot_saver.format_type # PNG, JPEG
 
-        image_settings.file_format = str(scene.screenshot_saver.format_type).upper()
-        if scene.screenshot_saver.format_type != 'jpeg':
-            image_settings.color_depth = '16'
+        # Resolve the render operator once per batch
+        self.render_opengl = bpy.ops.render.opengl
 
-    def render_screenshot(self, context) -> int:
-        '''A base for calling per screenshot setup methods and rendering each screenshot'''
         if self.render_type == 'enabled':
-            # Begin looping through screenshots
-            rendered_screenshots = [scrshot for scrshot in context.scene.scrshot_camera_coll if scrshot.enabled]
-            for scrshot in rendered_screenshots:
-                # Load the user settings for this particular screenshot
-                self.handle_user_settings(context, active_scrshot=scrshot)
-
-                # Use opengl renders for both workbench and eevee (speed trumps quality here)
-                bpy.ops.render.opengl(write_still=True)
-            return len(rendered_screenshots)
-        else: # Single
-            active_scrshot = context.scene.scrshot_camera_coll[context.scene.scrshot_camera_index]
-
-            self.handle_user_settings(context, active_scrshot)
-
-            bpy.ops.render.opengl(write_still=True)
-            return 1
+            # Group screenshots with similar setups so fewer shading settings change between them.
+            # Default shading goes first, before any screenshot has touched the viewport shading
+            return sorted(
+                (scrshot for scrshot in scene.scrshot_camera_coll if scrshot.enabled),
+                key=self.render_group_key
+            )
+        return [scene.scrshot_camera_coll[scene.scrshot_camera_index]] # Single
+
+    def render_screenshot(self, context, active_scrshot) -> None:
+        '''Load the user settings for a particular screenshot and render it'''
+        self.handle_user_settings(context, active_scrshot, self.export_path)
+
+        # Use opengl renders for both workbench and eevee (speed trumps quality here)
+        #
+        # These are viewport renders, they need this window's 3D View so they can't be
+        # farmed out to background (-b) Blender processes, which have no viewport to draw
+        self.render_opengl(write_still=True)
 
-    def execute(self, context):
+    def begin_render(self, context) -> bool:
+        '''Save and override all settings shared by the rendered screenshots, returns False if rendering can't start'''
         if not bpy.data.filepath:
             self.report({'ERROR'}, "Please save a blender file before recording screenshots")
-            return {'CANCELLED'}
+            return False
+
+        # The folder could have been removed since the panels last checked
+        invalidate_export_path_cache()
+        if not export_path_exists():
+            self.report({'ERROR'}, "Export path does not exist")
+            return False
 
         # Start counting execution time
-        start = time.time()
+        self.start_time = time.time()
 
         self.report_string = ''
 
@@ -379,19 +602,21 @@ class SCRSHOT_OT_render_screenshots(OpInfo, Operator):
 
         self.get_space_data(context)
 
-        ob_hide_states, coll_hide_states = self.get_set_hidden_objects(context)
+        self.hide_states = self.get_set_hidden_objects(context)
 
         # Save current shading settings
         self.save_settings(context)
-        
+
         # Load misc/generic settings that will apply to all rendered screenshots
         self.handle_misc_sett(context)
 
-        # Prepare and render all screenshots
-        render_count = self.render_screenshot(context)
+        self.rendered_screenshots = self.get_rendered_screenshots(context)
+        return True
 
+    def end_render(self, context, render_count: int) -> None:
+        '''Restore all original settings and report the results'''
         # Reload original shading/render vis settings
-        self.load_saved_settings(context, ob_hide_states, coll_hide_states)
+        self.load_saved_settings(context, *self.hide_states)
 
         # This is only seen when rendering manually, will get overwritten by standard saving message
         if self.report_string:
@@ -401,13 +626,83 @@ class SCRSHOT_OT_render_screenshots(OpInfo, Operator):
 
         # End the timer
         end = time.time()
-        execution_time = end - start
+        execution_time = end - self.start_time
         log.debug(f'Render Finished! Execution Time: {execution_time}')
+
+    def execute(self, context):
+        if not self.begin_render(context):
+            return {'CANCELLED'}
+
+        # Prepare and render all screenshots
+        render_count = 0
+        try:
+            for scrshot in self.rendered_screenshots:
+                self.render_screenshot(context, scrshot)
+                render_count += 1
+        except Exception as error: # Still hand the scene back before giving up
+            self.end_render(context, render_count)
+            self.report({'ERROR'}, f"Rendering stopped early: {error}")
+            return {'CANCELLED'}
+
+        self.end_render(context, render_count)
         return {'FINISHED'}
 
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            return self.finish_modal(context)
+
+        # Block all other input, the scene is in a temporary state until every screenshot is done
+        if event.type != 'TIMER':
+            return {'RUNNING_MODAL'}
+
+        if self.render_index == len(self.rendered_screenshots):
+            return self.finish_modal(context)
+
+        # One screenshot per timer event, the UI gets to redraw in between
+        try:
+            self.render_screenshot(context, self.rendered_screenshots[self.render_index])
+        except Exception as error:
+            # Blender doesn't call cancel() for an exception in modal, tear down here
+            # or the scene, timer and rendering flag are left in their batch state
+            self.finish_modal(context)
+            self.report({'ERROR'}, f"Rendering stopped early: {error}")
+            return {'CANCELLED'}
+
+        self.render_index += 1
+        context.window_manager.progress_update(self.render_index)
+        return {'RUNNING_MODAL'}
+
+    def finish_modal(self, context):
+        wm = context.window_manager
+        wm.event_timer_remove(self.timer)
+        wm.progress_end()
+        SCRSHOT_OT_render_screenshots.rendering = False
+
+        self.end_render(context, self.render_index)
+        return {'FINISHED'}
+
+    def cancel(self, context):
+        # Blender is dropping the operator (file load, window closed), the scene still needs restoring
+        self.finish_modal(context)
+
+    def invoke(self, context, event):
+        if not self.begin_render(context):
+            return {'CANCELLED'}
+
+        self.render_index = 0
+
+        wm = context.window_manager
+        wm.progress_begin(0, len(self.rendered_screenshots))
+        self.timer = wm.event_timer_add(0.01, window=context.window)
+        wm.modal_handler_add(self)
+        SCRSHOT_OT_render_screenshots.rendering = True
+        return {'RUNNING_MODAL'}
+
 
 ### OUTLINER OPS ###
 
+CAMERA_COLL_NAME = 'ScrSaver Cameras (do not touch)'
+
 class SCRSHOT_OT_add_screenshot_item(OpInfo, Operator):
     """Add a new screenshot item to the scene"""
     bl_idname = "scrshot.add_screenshot_item"
@@ -415,12 +710,11 @@ class SCRSHOT_OT_add_screenshot_item(OpInfo, Operator):
 
     def create_coll_and_cam(self, context, active_scrshot_name):
         # Create a collection to service add-on cameras
-        if not 'ScrSaver Cameras (do not touch)' in bpy.data.collections:
-            new_coll = bpy.data.collections.new(name = "ScrSaver Cameras (do not touch)")
-                
+        new_coll = bpy.data.collections.get(CAMERA_COLL_NAME)
+        if new_coll is None:
+            new_coll = bpy.data.collections.new(name = CAMERA_COLL_NAME)
+
             context.scene.collection.children.link(new_coll)
-        else:
-            new_coll = bpy.data.collections.get('ScrSaver Cameras (do not touch)')
 
         # Get users camera position
         region = context.space_data.region_3d # This is the space the mouse is hovering over, fine for our needs but
@@ -442,7 +736,7 @@ class SCRSHOT_OT_add_screenshot_item(OpInfo, Operator):
         new_camera_ob.location = view_matrix_transl
         new_camera_ob.rotation_euler = view_matrix_rot
         new_camera_ob.screenshot_id = new_camera_ob.name
-        new_camera_ob.lock_scale[0] = new_camera_ob.lock_scale[1] = new_camera_ob.lock_scale[2] = True
+        new_camera_ob.lock_scale = (True, True, True)
         new_cam_data.screenshot_id = new_cam_data.name
         new_cam_data.passepartout_alpha = .9
         new_cam_data.lens = context.space_data.lens
@@ -453,16 +747,14 @@ class SCRSHOT_OT_add_screenshot_item(OpInfo, Operator):
         context.scene.camera = new_camera_ob
 
         # Deselect all objects
-        for ob in context.selected_objects:
-            ob.select_set(False)
+        deselect_all_objects(context)
 
         context.view_layer.objects.active = new_camera_ob
 
         new_camera_ob.hide_select = False
         new_camera_ob.select_set(True)
 
-        if region.view_perspective != 'CAMERA':
-            bpy.ops.view3d.view_camera() # Override the context if method changes. Changing the view "manually" has issues
+        ensure_camera_view(region)
         return new_camera_ob
 
     def execute(self, context):
@@ -473,14 +765,15 @@ class SCRSHOT_OT_add_screenshot_item(OpInfo, Operator):
         item.cam_res_x = scene.render.resolution_x
         item.cam_res_y = scene.render.resolution_y
 
-        idx_count = 0
-        name_found = False
-        while not name_found:
+        # Use the lowest free name, collected into a set first as each
+        # "in" check on the collection is a linear search
+        used_names = {scrshot.name for scrshot in scene.scrshot_camera_coll}
+
+        idx_count = 1
+        while f'screenshot_{idx_count}' in used_names:
             idx_count += 1
 
-            if f'screenshot_{idx_count}' not in scene.scrshot_camera_coll:
-                item.name = f"screenshot_{idx_count}"
-                name_found = True
+        item.name = f"screenshot_{idx_count}"
 
         item.subfolder_name = item.name
 
@@ -489,6 +782,10 @@ class SCRSHOT_OT_add_screenshot_item(OpInfo, Operator):
         item.camera_ob = camera_ob
 
         scene.scrshot_camera_index = len(scene.scrshot_camera_coll) - 1
+
+        # The list lives in this area's sidebar, only it needs redrawing
+        if context.area is not None:
+            context.area.tag_redraw()
         return {'FINISHED'}
 
 
@@ -505,21 +802,25 @@ class SCRSHOT_OT_delete_screenshot_item(OpInfo, Operator):
             camera_index = scene.scrshot_camera_index
             active_scrshot = scene.scrshot_camera_coll[camera_index]
 
-            for ob in bpy.data.objects:
-                if ob.screenshot_id == active_scrshot.name:
-                    bpy.data.objects.remove(ob)
+            # Go through the item's own camera rather than scanning every object/camera,
+            # datablock names can drift from the screenshot_id (name clashes, user renames)
+            camera_ob = active_scrshot.camera_ob
+            if camera_ob is not None and camera_ob.screenshot_id == active_scrshot.name:
+                camera_data = camera_ob.data if camera_ob.type == 'CAMERA' else None
 
-            for cam in bpy.data.cameras:
-                if cam.screenshot_id == active_scrshot.name:
-                    bpy.data.cameras.remove(cam)
+                bpy.data.objects.remove(camera_ob)
+
+                if camera_data is not None and camera_data.screenshot_id == active_scrshot.name:
+                    bpy.data.cameras.remove(camera_data)
 
             scene.scrshot_camera_coll.remove(camera_index)
             
             # Move objects contained inside the bake group collection to the root collection level and delete the collection
-            if not len(scene.scrshot_camera_coll) and 'ScrSaver Cameras (do not touch)' in bpy.data.collections:
-                bake_group_coll = bpy.data.collections.get("ScrSaver Cameras (do not touch)")
+            if not len(scene.scrshot_camera_coll):
+                bake_group_coll = bpy.data.collections.get(CAMERA_COLL_NAME)
                 if bake_group_coll is not None:
-                    for ob in bake_group_coll.all_objects:
+                    # Snapshot first, unlinking while iterating the live collection skips objects
+                    for ob in bake_group_coll.all_objects[:]:
                         # Move object to the master collection
                         context.scene.collection.objects.link(ob)
                         
@@ -533,6 +834,9 @@ class SCRSHOT_OT_delete_screenshot_item(OpInfo, Operator):
         # If the current index is larger than the array set the active index to the lowest item in the list
         if (camera_index + 1) > len(scene.scrshot_camera_coll):
             scene.scrshot_camera_index = camera_index - 1
+
+        if context.area is not None:
+            context.area.tag_redraw()
         return {'FINISHED'}
 
 
@@ -567,14 +871,12 @@ class SCRSHOT_OT_select_and_preview(OpInfo, Operator):
             scene.render.resolution_x = active_scrshot.cam_res_x
             scene.render.resolution_y = active_scrshot.cam_res_y
 
-            if context.space_data.region_3d.view_perspective != 'CAMERA':
-                bpy.ops.view3d.view_camera()
+            ensure_camera_view(context.space_data.region_3d)
 
         if (len(scene.scrshot_camera_coll)) > active_scrshot.id:
             scene.scrshot_camera_index = active_scrshot.id
 
-        for ob in context.selected_objects:
-            ob.select_set(False)
+        deselect_all_objects(context)
 
         camera_ob.hide_select = False
         camera_ob.select_set(True)
@@ -590,18 +892,8 @@ class SCRSHOT_OT_copy_screenshot_settings(OpInfo, Operator):
     def execute(self, context):
         active_scrshot = context.scene.scrshot_camera_coll[context.scene.scrshot_camera_index]
 
-        # Create simplified dictionary for use in JSON
-        scrshot_copy_vars = {}
-        for key in active_scrshot.__annotations__.keys():
-            key_attr = getattr(active_scrshot, key)
-
-            # Ignore values that are for specific datablocks, JSON won't 
-            # be able to parse the objects and we don't need them
-            # 
-            # Also ignore certain internal keys manually, not a great
-            # method but the list shouldn't get bigger
-            if isinstance(key_attr, (str, int, bool)) and key not in {'id', 'name', 'saved_name', 'enabled', 'subfolder_name'}:
-                scrshot_copy_vars[str(key)] = key_attr
+        # Create simplified dictionary for use in JSON, copy_keys is set up in properties.py
+        scrshot_copy_vars = {key: detach_value(getattr(active_scrshot, key)) for key in active_scrshot.copy_keys}
 
         # Get other generic attributes attached to the camera data
         # ob_data_ is a prefix for figuring out data to update
@@ -609,18 +901,15 @@ class SCRSHOT_OT_copy_screenshot_settings(OpInfo, Operator):
         scrshot_copy_vars['ob_data_display_size'] = active_scrshot.camera_ob.data.display_size
         scrshot_copy_vars['ob_data_angle'] = active_scrshot.camera_ob.data.angle
 
-        # Add-on root path & temp file path
-        addon_path = os.path.dirname(__file__)
-
-        temps_path = Path(addon_path, "temp")
-        temps_path.mkdir(exist_ok=True)
+        scrshot_clipboard.clear()
+        scrshot_clipboard.update(scrshot_copy_vars)
 
-        # Serializing
-        scrshot_copy_json = json.dumps(scrshot_copy_vars, indent=2)
+        # Also write to file so the settings can be pasted in other sessions
+        TEMP_PATH.mkdir(exist_ok=True)
 
-        # Writing to file
-        with open(Path(temps_path, "latest_screenshot_copy.json"), "w") as outfile:
-            outfile.write(scrshot_copy_json)
+        # Compact output, the file is only read back by the paste operator
+        with open(SCRSHOT_COPY_PATH, "w") as outfile:
+            json.dump(scrshot_copy_vars, outfile, separators=(',', ':'))
 
         self.report({'INFO'}, "Camera Settings Copied!")
         return {'FINISHED'}
@@ -633,26 +922,32 @@ class SCRSHOT_OT_paste_screenshot_settings(OpInfo, Operator):
     bl_options = {'INTERNAL'}
 
     def execute(self, context):
-        # Add-on root path & temp file path
-        addon_path = os.path.dirname(__file__)
-        screenshot_copy_path = os.path.join(addon_path, "temp\\latest_screenshot_copy.json")
-        if not os.path.isfile(screenshot_copy_path):
-            self.report({'ERROR'}, "You haven't copied anything yet!")
-            return {'FINISHED'}
+        if scrshot_clipboard:
+            scrshot_copy_data = scrshot_clipboard
+        else: # Nothing copied this session, fall back to the last copy on file
+            try:
+                with open(SCRSHOT_COPY_PATH) as scrshot_copy_json:
+                    # Return JSON object as a dictionary
+                    scrshot_copy_data = json.load(scrshot_copy_json)
+            except FileNotFoundError:
+                self.report({'ERROR'}, "You haven't copied anything yet!")
+                return {'FINISHED'}
 
-        with open(screenshot_copy_path) as scrshot_copy_json:
-            # Return JSON object as a dictionary
-            scrshot_copy_data = json.load(scrshot_copy_json)
-            
-            # Iterate through the json list
-            active_scrshot = context.scene.scrshot_camera_coll[context.scene.scrshot_camera_index]
-            for key, value in scrshot_copy_data.items():
-                log.debug(f'{key} -> {value} {type(value)}')
+            # Following pastes this session don't need to touch the file again
+            scrshot_clipboard.update(scrshot_copy_data)
+
+        # Iterate through the json list
+        active_scrshot = context.scene.scrshot_camera_coll[context.scene.scrshot_camera_index]
+        for key, value in scrshot_copy_data.items():
+            log.debug(f'{key} -> {value} {type(value)}')
 
-                if key.startswith('ob_data_'):
-                    setattr(active_scrshot.camera_ob.data, key[8:], value)
-                else:
-                    setattr(active_scrshot, key, value)
+            if key.startswith('ob_data_'):
+                setattr(active_scrshot.camera_ob.data, key[8:], value)
+            else:
+                setattr(active_scrshot, key, value)
+
+        if context.area is not None:
+            context.area.tag_redraw()
 
         self.report({'INFO'}, "Camera Settings Pasted!")
         return {'FINISHED'}
@@ -680,49 +975,25 @@ class SCRSHOT_OT_copy_viewport_shade_settings(OpInfo, Operator):
         if active_scrshot.render_type == 'workbench':
             shading.type = 'SOLID'
 
-            active_scrshot.lighting_type = str(shading.light).lower()
-            active_scrshot.color_type = str(shading.color_type).lower()
-
-            active_scrshot.use_wsl = shading.use_world_space_lighting
-
-            active_scrshot.use_backface_culling = shading.show_backface_culling
-            active_scrshot.use_cavity = shading.show_cavity
-            active_scrshot.use_outline = shading.show_object_outline
-            active_scrshot.use_spec_lighting = shading.show_specular_highlight
+            # Same attribute pairs the render operator loads, read back the other way
+            set_if_changed(active_scrshot, 'lighting_type', shading.light.lower())
+            set_if_changed(active_scrshot, 'color_type', shading.color_type.lower())
+            set_if_changed(active_scrshot, 'use_wsl', shading.use_world_space_lighting)
+            set_if_changed(active_scrshot, 'single_color_value', detach_value(shading.single_color))
 
-            active_scrshot.cavity_ridge = shading.cavity_ridge_factor
-            active_scrshot.cavity_valley = shading.cavity_valley_factor
-            active_scrshot.curve_ridge = shading.curvature_ridge_factor
-            active_scrshot.curve_valley = shading.curvature_valley_factor
+            for shading_attr, scrshot_attr in WORKBENCH_SHADING_MAP:
+                set_if_changed(active_scrshot, scrshot_attr, detach_value(getattr(shading, shading_attr)))
 
-            active_scrshot.outliner_color_value = shading.object_outline_color
-
-            active_scrshot.single_color_value = shading.single_color
-
-            saved_lighting_type = active_scrshot.lighting_type
-
-            active_scrshot.lighting_type = 'studio'
-            bpy.ops.scrshot.get_studio_light(light_type = 'workbench')
-
-            active_scrshot.lighting_type = 'matcap'
-            bpy.ops.scrshot.get_studio_light(light_type = 'workbench')
- 
-            active_scrshot.lighting_type = saved_lighting_type
-            
+            capture_studio_light(shading, active_scrshot, 'studio')
+            capture_studio_light(shading, active_scrshot, 'matcap')
         else: # EEVEE
             shading.type = 'MATERIAL'
 
-            active_scrshot.eevee_use_rotate = shading.use_studiolight_view_rotation
-            active_scrshot.eevee_intensity = shading.studiolight_intensity
-            active_scrshot.eevee_alpha = shading.studiolight_background_alpha
-            active_scrshot.eevee_blur = shading.studiolight_background_blur
-
-            active_scrshot.use_scene_lights = shading.use_scene_lights
-            active_scrshot.use_scene_world = shading.use_scene_world
-
-            bpy.ops.scrshot.get_studio_light(light_type = 'eevee')
+            # Includes the HDRi name, readable directly as the shading type is already MATERIAL
+            for shading_attr, scrshot_attr in EEVEE_SHADING_MAP:
+                set_if_changed(active_scrshot, scrshot_attr, detach_value(getattr(shading, shading_attr)))
 
-        active_scrshot.studio_rotate_z = shading.studiolight_rotate_z
+        set_if_changed(active_scrshot, 'studio_rotate_z', shading.studiolight_rotate_z)
 
         shading.type = saved_shading_type
 
@@ -749,35 +1020,20 @@ class SCRSHOT_OT_get_studio_light(OpInfo, Operator):
         return active_screenshot_exists()
 
     def execute(self, context):
-        shading = context.space_data.shading
-
-        saved_shading_type = shading.type
-        saved_shading_light = shading.light
-
         active_scrshot = context.scene.scrshot_camera_coll[context.scene.scrshot_camera_index]
 
-        if self.light_type == 'workbench':
-            shading.type = 'SOLID'
-
-            if active_scrshot.lighting_type == 'studio':
-                shading.light = 'STUDIO'
-                active_scrshot.studio_light_name = shading.studio_light
-
-            elif active_scrshot.lighting_type == 'matcap':
-                shading.light = 'MATCAP'
-                active_scrshot.matcap_light_name = shading.studio_light
-        else: # EEVEE
-            shading.type = 'MATERIAL'
-
-            active_scrshot.eevee_light_name = shading.studio_light
-
-        shading.type = saved_shading_type
-        shading.light = saved_shading_light
+        # Workbench captures whichever of studio/matcap the item uses (nothing for flat)
+        mode = active_scrshot.lighting_type if self.light_type == 'workbench' else 'eevee'
+        capture_studio_light(context.space_data.shading, active_scrshot, mode)
 
         self.report({'INFO'}, "Copied studio light name!")
         return {'FINISHED'}
 
 
+# Minimum seconds between light rotation updates while sampling, high polling
+# rate mice send far more move events than the viewport can redraw
+ROTATION_UPDATE_INTERVAL = 1 / 120
+
 class SCRSHOT_OT_sample_studio_light_rotation(OpInfo, Operator):
     """Move an object with the mouse, example"""
     bl_idname = "scrshot.sample_studio_light_rotation"
@@ -792,23 +1048,42 @@ class SCRSHOT_OT_sample_studio_light_rotation(OpInfo, Operator):
         options={'HIDDEN'}
     )
 
+    def apply_rotation(self, context) -> None:
+        '''Rotate the light by the mouse movement gathered since the last update'''
+        shading = self.shading
+
+        # Work on a local copy and write it out once
+        rotate_z = shading.studiolight_rotate_z + self.pending_offset * .0075
+        self.pending_offset = 0
+
+        # Wrap around into the property's -pi to pi range, keeping whatever went past the edge
+        rotate_z = (rotate_z + pi) % tau - pi
+
+        shading.studiolight_rotate_z = self.active_scrshot.studio_rotate_z = rotate_z
+
+        # The header only shows whole degrees, most updates don't change it
+        shown_degrees = round(degrees(rotate_z))
+        if shown_degrees != self.shown_degrees:
+            self.shown_degrees = shown_degrees
+            context.area.header_text_set(f"Light Rotation Sample: {shown_degrees}")
+
     def modal(self, context, event):
-        if event.type == 'MOUSEMOVE':
-            offset = event.mouse_x - event.mouse_prev_x
-            self.shading.studiolight_rotate_z += offset * .0075
-
-            if self.shading.studiolight_rotate_z <= -3.141592:
-                self.shading.studiolight_rotate_z = 3.141592
-            elif self.shading.studiolight_rotate_z >= 3.141592:
-                self.shading.studiolight_rotate_z = -3.141592
-            
-            self.active_scrshot.studio_rotate_z = self.shading.studiolight_rotate_z
+        event_type = event.type
 
-            studiolight_rotate_z_degree = self.shading.studiolight_rotate_z * 180 / 3.14159265359
+        if event_type == 'MOUSEMOVE':
+            # Gather the movement of every event, but only rotate (and redraw) at a capped rate
+            self.pending_offset += event.mouse_x - event.mouse_prev_x
 
-            context.area.header_text_set(f"Light Rotation Sample: {round(studiolight_rotate_z_degree)}")
+            now = time.perf_counter()
+            if now - self.last_update >= ROTATION_UPDATE_INTERVAL:
+                self.last_update = now
+                self.apply_rotation(context)
+
+        if event_type == 'LEFTMOUSE':
+            # Don't lose the movement since the last update
+            if self.pending_offset:
+                self.apply_rotation(context)
 
-        if event.type == 'LEFTMOUSE':
             context.window.cursor_set('DEFAULT')
             context.area.header_text_set(None)
 
@@ -816,7 +1091,7 @@ class SCRSHOT_OT_sample_studio_light_rotation(OpInfo, Operator):
             self.report({'INFO'}, "Light Rotation Sampled!")
             return {'FINISHED'}
 
-        elif event.type in {'RIGHTMOUSE', 'ESC'}:
+        elif event_type in {'RIGHTMOUSE', 'ESC'}:
             context.window.cursor_set('DEFAULT')
             context.area.header_text_set(None)
 
@@ -827,31 +1102,32 @@ class SCRSHOT_OT_sample_studio_light_rotation(OpInfo, Operator):
         return {'RUNNING_MODAL'}
 
     def execute(self, context):
-        self.shading.type = self.saved_type
-        self.shading.light = self.saved_light
-        self.shading.use_world_space_lighting = self.saved_use_wsl
-        self.shading.studiolight_rotate_z = self.saved_studiolight_rot_z
+        shading = self.shading
 
-        self.shading.use_scene_world = self.saved_use_scene_world
-        self.shading.use_studiolight_view_rotation = self.saved_use_studiolight_view_rotation
+        # Same order as saved in invoke, type/light go first as the rest depends on them
+        (
+            shading.type, shading.light, shading.use_world_space_lighting, shading.studiolight_rotate_z,
+            shading.use_scene_world, shading.use_studiolight_view_rotation
+        ) = self.saved_shading
         return {'FINISHED'}
 
     def invoke(self, context, event):
-        self.shading = context.space_data.shading
+        shading = self.shading = context.space_data.shading
 
         self.active_scrshot = context.scene.scrshot_camera_coll[context.scene.scrshot_camera_index]
 
-        self.saved_type = self.shading.type
-        self.saved_light = self.shading.light
-        self.saved_use_wsl = self.shading.use_world_space_lighting
-
-        self.saved_studiolight_rot_z = self.shading.studiolight_rotate_z
-
-        self.saved_use_scene_world = self.shading.use_scene_world
-        self.saved_use_studiolight_view_rotation = self.shading.use_studiolight_view_rotation
+        # Everything the sampling changes, restored in one go by execute
+        self.saved_shading = (
+            shading.type, shading.light, shading.use_world_space_lighting, shading.studiolight_rotate_z,
+            shading.use_scene_world, shading.use_studiolight_view_rotation
+        )
 
         self.saved_item_rotate_z = self.active_scrshot.studio_rotate_z
 
+        self.pending_offset = 0
+        self.last_update = 0.0
+        self.shown_degrees = None
+
         if self.light_type == 'workbench':
             self.shading.type = 'SOLID'
             self.shading.light = 'STUDIO'
@@ -872,82 +1148,207 @@ class SCRSHOT_OT_sample_studio_light_rotation(OpInfo, Operator):
         return {'RUNNING_MODAL'}
 
 
+# First 8 bytes of every PNG, the IHDR chunk's width & height follow at bytes 16-24
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# JPEG start of frame markers hold the image size, DHT (C4), JPG (C8) & DAC (CC) share their range
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def read_jpeg_size(f) -> tuple:
+    '''Walk the JPEG segment markers up to the start of frame, returns None if the file can't be read this way'''
+    f.seek(2) # Skip the SOI marker
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+
+        code = marker[1]
+        while code == 0xFF: # Fill bytes before the actual marker code
+            byte = f.read(1)
+            if not byte:
+                return None
+            code = byte[0]
+
+        if code == 0x01 or 0xD0 <= code <= 0xD8: # Standalone markers have no length
+            continue
+
+        segment = f.read(2)
+        if len(segment) < 2:
+            return None
+        length = struct.unpack('>H', segment)[0]
+
+        if code in JPEG_SOF_MARKERS:
+            frame_header = f.read(5)
+            if len(frame_header) < 5:
+                return None
+            height, width = struct.unpack('>xHH', frame_header)
+            return width, height
+
+        f.seek(length - 2, 1)
+
+# Palette generation shared by all GIF palette modes
+GIF_PALETTE_GEN = 'palettegen=reserve_transparent=1:transparency_color=000000:stats_mode=full'
+
+# A single pass GIF holds every decoded frame in memory until palettegen has seen the last one,
+# past this estimate the palette is written to a file first and the frames get read twice instead
+GIF_SINGLE_PASS_MAX_BYTES = 2 * 1024**3
+
+# CPU H.264 encoding, -threads 0 lets x264 use every core
+X264_ENCODER_ARGS = ('-c:v', 'libx264', '-preset', 'slow', '-crf', '20', '-threads', '0', '-pix_fmt', 'yuv420p')
+
+# GPU H.264 encoders in order of preference, with their closest match to x264's quality settings
+HW_ENCODER_ARGS = (
+    ('h264_nvenc', ('-c:v', 'h264_nvenc', '-preset', 'slow', '-cq', '20', '-pix_fmt', 'yuv420p')),
+    ('h264_qsv', ('-c:v', 'h264_qsv', '-global_quality', '20', '-pix_fmt', 'nv12')),
+    ('h264_amf', ('-c:v', 'h264_amf', '-rc', 'cqp', '-qp_i', '20', '-qp_p', '20', '-pix_fmt', 'yuv420p'))
+)
+
+HW_ENCODER_PROBE_TIMEOUT = 5 # Seconds per encoder, a missing GPU or driver fails almost instantly
+
+def probe_hw_encoder_args() -> tuple:
+    '''Get the args of the first GPU encoder that works on this machine, None if none of them do'''
+    # The bundled build lists every encoder it was compiled with, whether or not the GPU
+    # (and driver) behind it exists, so each one is checked with a real one frame encode
+    for name, args in HW_ENCODER_ARGS:
+        try:
+            returncode = subprocess.run(
+                [
+                    str(FFMPEG_PATH), '-hide_banner', '-loglevel', 'error',
+                    '-f', 'lavfi', '-i', 'nullsrc=s=256x256', '-frames:v', '1',
+                    *args, '-f', 'null', '-'
+                ],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=HW_ENCODER_PROBE_TIMEOUT
+            ).returncode
+        except OSError: # ffmpeg is missing entirely
+            return None
+        except subprocess.TimeoutExpired:
+            continue
+
+        if returncode == 0:
+            log.debug(f'Using the {name} encoder for MP4s')
+            return args
+    return None
+
+
+# Future of the GPU encoder probe, only run once per session
+hw_encoder_probe = None
+
+def start_hw_encoder_probe() -> None:
+    '''Test the GPU encoders on a background thread, Blender never waits on the test encodes'''
+    global hw_encoder_probe
+    if hw_encoder_probe is None:
+        executor = ThreadPoolExecutor(max_workers=1)
+        hw_encoder_probe = executor.submit(probe_hw_encoder_args)
+        executor.shutdown(wait=False)
+
+
+def get_hw_encoder_args() -> tuple:
+    '''Get the probed GPU encoder args, None while the probe is still running or if no GPU encoder works'''
+    start_hw_encoder_probe()
+    if not hw_encoder_probe.done():
+        return None
+    return hw_encoder_probe.result()
+
+# Cached per (file path, modified time), frames are never rewritten in place so
+# regenerating the same sequence doesn't have to read (or parse EXR headers) again
+@lru_cache(maxsize=4096)
+def read_image_size(file_path: Path, mtime_ns: int) -> tuple:
+    '''Read the resolution of a rendered image from its header, mtime_ns is only there as part of the cache key'''
+    if file_path.suffix == '.exr':
+        data_window = read_exr_header(str(file_path))['dataWindow']
+        return int(data_window['xMax'])+1, int(data_window['yMax'])+1
+
+    # Read sizes straight from the headers, skip Pillow's format detection & decoder setup
+    with open(file_path, 'rb') as f:
+        header = f.read(24)
+        if header[:8] == PNG_SIGNATURE: # At a fixed offset
+            return struct.unpack('>II', header[16:24])
+
+        if header[:2] == b'\xff\xd8': # JPEG SOI marker
+            size = read_jpeg_size(f)
+            if size is not None:
+                return size
+
+    with Image.open(str(file_path)) as img: # Anything the readers above can't handle
+        return img.size
+
+
 class SCRSHOT_OT_generate_mp4(OpInfo, Operator):
     """Generate an MP4 or GIF of the selected active screenshot"""
     bl_idname = "scrshot.generate_mp4"
     bl_label = "Generate MP4/GIF"
 
+    # Runs share the concat list and could pick the same output name, so only one encodes at a time
+    encoding = False
+
     @classmethod
     def poll(cls, context):
-        return active_screenshot_exists() and export_path_exists()
-
-    def generate_palette(self, concat_file_path) -> str:
-        '''Generate a color palette from a given image sequence'''
-        palette_file_path = Path(Path(os.path.abspath(__file__)).parent, "temp", "palette.png")
+        return not cls.encoding and active_screenshot_exists() and export_path_exists()
 
-        # Create args
-        call_args = [
-            f'{Path(Path(os.path.abspath(__file__)).parent, "ffmpeg", "bin", "ffmpeg.exe")}',
-            '-y',
-            '-f', 'concat', '-safe', '0',
-            '-i', f'{concat_file_path}',
-            '-vf', 'palettegen=reserve_transparent=1:transparency_color=000000:stats_mode=full',
-            f'{palette_file_path}'
+    def generate_text_file(self, input_path, render_files: list) -> str:
+        '''Generate a text file that outlines the image sequences order and length'''
+        # Build the whole list first and write it out in one go
+        parent = str(input_path.parent)
+        lines = [
+            f"file '{os.path.join(parent, filename)}'\nduration 1\n" # Add duration to get rid of warnings
+            for filename in render_files
         ]
 
-        if bpy.context.scene.screenshot_saver.format_type == 'open_exr':
-            call_args.insert(2, '-apply_trc')
-            call_args.insert(3, 'iec61966_2_1')
+        # If start/end repeat has been set, add the first/final frame x amount of times
+        if lines:
+            scrshot_saver = bpy.context.scene.screenshot_saver
+            lines[:0] = [lines[0]] * scrshot_saver.mp4_start_repeat_count
+            lines.extend([lines[-1]] * scrshot_saver.mp4_end_repeat_count)
+
+        TEMP_PATH.mkdir(exist_ok=True)
+        with open(CONCAT_PATH, 'w') as f:
+            f.write(''.join(lines))
+        return CONCAT_PATH
+
+    def get_image_size(self, file_path: Path) -> tuple:
+        '''Get the resolution of a rendered image, cached until the file changes'''
+        return read_image_size(file_path, file_path.stat().st_mtime_ns)
+
+    def estimate_gif_frame_bytes(self, scrshot_saver, input_path: Path, render_files: list) -> int:
+        '''Estimate the memory a single pass GIF needs to hold every cropped & scaled frame'''
+        if not render_files:
+            return 0
+
+        # Frames of a sequence share a resolution, the first one stands in for all of them
+        if scrshot_saver.mp4_crop_type == 'to_resolution':
+            width, height = scrshot_saver.mp4_crop_res_x, scrshot_saver.mp4_crop_res_y
+        else:
+            width, height = self.get_image_size(Path(input_path.parent, render_files[0]))
+            if scrshot_saver.mp4_crop_type == 'from_border':
+                width -= scrshot_saver.mp4_crop_amt_width
+                height -= scrshot_saver.mp4_crop_amt_height
 
-        subprocess.call(call_args)
-        return palette_file_path
+        downscale = int(scrshot_saver.mp4_res_downscale)
+        frame_count = len(render_files) + scrshot_saver.mp4_start_repeat_count + scrshot_saver.mp4_end_repeat_count
 
-    def generate_text_file(self, input_path, file_format) -> str:
-        '''Generate a text file that outlines the image sequences order and length'''
-        render_files = []
-        for filename in sorted(os.listdir(input_path.parent)):
-            if filename.startswith(input_path.stem + '_') and filename.endswith(file_format):
-                render_files.append(filename)
-
-        temp_path = Path(Path(os.path.abspath(__file__)).parent, "temp")
-        temp_path.mkdir(exist_ok=True)
-        concat_file_path = Path(temp_path, 'concat.txt')
-        with open(concat_file_path, 'w') as f:
-            for idx, file_path in enumerate(render_files):
-                if idx == 0: # If start repeat has been set, add the first iterable in render_files to the txt file x amount of times
-                    for _ in range(bpy.context.scene.screenshot_saver.mp4_start_repeat_count):
-                        f.write(f"file '{Path(input_path.parent, file_path)}'\nduration 1\n")
-
-                f.write(f"file '{Path(input_path.parent, file_path)}'\nduration 1\n") # Add duration to get rid of warnings
-
-            # If end repeat has been set, add the final iterable in render_files to the txt file x amount of times
-            for _ in range(bpy.context.scene.screenshot_saver.mp4_end_repeat_count):
-                f.write(f"file '{Path(input_path.parent, file_path)}'\nduration 1\n")
-        return concat_file_path
-
-    def handle_path_formatting_mp4(self, input_path) -> Path:
+        # EXRs decode to 32 bit float RGB, everything else to 8 bit RGBA
+        bytes_per_pixel = 12 if scrshot_saver.format_type == 'open_exr' else 4
+        return frame_count * (width // downscale) * (height // downscale) * bytes_per_pixel
+
+    def handle_path_formatting_mp4(self, input_path, entries: list) -> Path:
         '''Handle output file formatting'''
         scrshot_saver = bpy.context.scene.screenshot_saver
 
-        file_numbers = []
-        for filename in os.listdir(input_path.parent):
-            try:
-                if Path(input_path.parent, filename).is_file():
-                    file_numbers.append(int(filename.split('_')[-1].split(f'.{scrshot_saver.mp4_format_type}')[0]))
-            except ValueError:
-                pass
-
-        # Set the counter & format the path end with 4 digit suffix
-        if not len(file_numbers):
-            counter = 1
-        else:
-            counter = max(file_numbers)+1
+        # Set the counter & format the path end with 4 digit suffix, the
+        # files share the "<name>_<counter>.<extension>" naming of the rendered screenshots
+        matches = (FILE_COUNTER_PATTERN.match(filename) for filename, is_file in entries if is_file)
+        counter = max(
+            (int(match.group(2)) for match in matches
+             if match is not None and match.group(3) == scrshot_saver.mp4_format_type),
+            default=0
+        ) + 1
 
         file_path = str(input_path) + '_{:04d}'.format(counter)
 
         return Path(f'{file_path}.{scrshot_saver.mp4_format_type}')
 
-    def execute(self, context):
+    def begin_encode(self, context) -> bool:
+        '''Validate the rendered frames and build the ffmpeg arguments, returns False if encoding can't start'''
         scrshot_saver = context.scene.screenshot_saver
         active_scrshot = context.scene.scrshot_camera_coll[context.scene.scrshot_camera_index]
 
@@ -962,65 +1363,61 @@ class SCRSHOT_OT_generate_mp4(OpInfo, Operator):
         # Verify directory and file existence
         if not input_path.parent.is_dir():
             self.report({'ERROR'}, 'The render directory does not exist')
-            return{'CANCELLED'}
+            return False
 
         # Get the file extension type
         file_format = 'exr' if scrshot_saver.format_type == 'open_exr' else scrshot_saver.format_type
 
+        # List the render directory once, scandir already knows which entries are files
+        with os.scandir(input_path.parent) as dir_entries:
+            entries = [(entry.name, entry.is_file()) for entry in dir_entries]
+
         # Look for any files of the correct format
         files_list = [
-                    Path(input_path.parent, file_name) for file_name in os.listdir(input_path.parent)
-                    if Path(input_path.parent, file_name).is_file()
-                    and os.path.join(input_path.parent, file_name).endswith(file_format)
-                ]
+            Path(input_path.parent, file_name) for file_name, is_file in entries
+            if is_file and file_name.endswith(file_format)
+        ]
         if not len(files_list):
             self.report({'ERROR'}, 'There are no files of the correct type in this directory')
-            return{'CANCELLED'}
+            return False
 
         # Calculate the end result resolutions, and catch anything with a resolution not divisible by 2
         bad_res = False
-        if scrshot_saver.mp4_crop_type == 'none':
-            if scrshot_saver.format_type == 'open_exr':
-                for file in files_list:
-                    exr = read_exr_header(str(file))
-
-                    exr_width, exr_height  = int(exr['dataWindow']['xMax'])+1, int(exr['dataWindow']['yMax'])+1
-                    if (exr_width % 2) or (exr_height % 2):
-                        bad_res = True
-                        break
-            else: # PNG, JPEG
-                for file in files_list:
-                    img = Image.open(str(file))
+        if scrshot_saver.mp4_crop_type == 'to_resolution':
+            if (scrshot_saver.mp4_crop_res_x % 2) or (scrshot_saver.mp4_crop_res_y % 2):
+                bad_res = True
+        else: # No crop or from_border
+            if scrshot_saver.mp4_crop_type == 'from_border':
+                crop_width, crop_height = scrshot_saver.mp4_crop_amt_width, scrshot_saver.mp4_crop_amt_height
+            else:
+                crop_width = crop_height = 0
 
-                    width, height = img.size
-                    if (width % 2) or (height % 2):
-                        bad_res = True
-                        break
-        else: # Using crop
-            if scrshot_saver.mp4_crop_type == 'to_resolution':
-                if (scrshot_saver.mp4_crop_res_x % 2) or (scrshot_saver.mp4_crop_res_y % 2):
-                    bad_res = True
-            else: # from_border
-                for file in files_list:
-                    img = Image.open(str(file))
-
-                    width, height = img.size
-                    if ((width-scrshot_saver.mp4_crop_amt_width) % 2) or ((height-scrshot_saver.mp4_crop_amt_height) % 2):
+            # Header reads are mostly waiting on the disk, overlap them across threads
+            with ThreadPoolExecutor() as executor:
+                for width, height in executor.map(self.get_image_size, files_list):
+                    if ((width-crop_width) % 2) or ((height-crop_height) % 2):
                         bad_res = True
+                        executor.shutdown(cancel_futures=True) # Don't wait on the remaining reads
                         break
 
         if bad_res:
             self.report({'ERROR'}, 'An image with a resolution (or crop res) that is not divisible by 2 was found.\n\nConsider using the crop feature to encode.')
-            return{'CANCELLED'}
-
-        # Generate an ordered list of the frames to render
-        concat_file_path = self.generate_text_file(input_path, file_format)
+            return False
+
+        # Generate an ordered list of the frames to render, ordered by their counter
+        # rather than by name as counters past 9999 outgrow the zero padding
+        frame_matches = (FILE_COUNTER_PATTERN.match(filename) for filename, is_file in entries if is_file)
+        render_files = [
+            match.group(0) for match in sorted(
+                (match for match in frame_matches
+                 if match is not None and match.group(1) == input_path.name and match.group(3) == file_format),
+                key=lambda match: int(match.group(2))
+            )
+        ]
+        concat_file_path = self.generate_text_file(input_path, render_files)
 
         # Handle file path formatting/versioning
-        output_path = self.handle_path_formatting_mp4(input_path)
-
-        # Get the path of the local ffmpeg lib
-        ffmpeg_path = Path(Path(os.path.abspath(__file__)).parent, "ffmpeg", "bin", "ffmpeg.exe")
+        output_path = self.handle_path_formatting_mp4(input_path, entries)
 
         # Get crop width + height
         if scrshot_saver.mp4_crop_type == 'from_border':
@@ -1033,51 +1430,176 @@ class SCRSHOT_OT_generate_mp4(OpInfo, Operator):
         # Get downscale amount
         scale_amt = f"scale=-1:ih/{scrshot_saver.mp4_res_downscale}"
 
+        # Crop & downscale chain shared by every output type
+        frame_filter = f"{crop_amt},{scale_amt}"
+
         # Create args
+        self.fallback_call_args = None
+        self.palette_call_args = None
         if scrshot_saver.mp4_format_type == 'mp4':
+            def mp4_call_args(encoder_args: tuple) -> list:
+                return [
+                    f'{FFMPEG_PATH}',
+                    '-y',
+                    '-f', 'concat', '-safe', '0',
+                    '-r', f'{scrshot_saver.mp4_framerate}',
+                    '-i', f'{concat_file_path}',
+                    '-filter_complex', f"[0:v]{frame_filter}",
+                    *encoder_args,
+                    f'{output_path}'
+                ]
+
+            # Use the CPU when no GPU encoder works (or the check for one hasn't finished yet)
+            hw_encoder_args = get_hw_encoder_args() if scrshot_saver.mp4_use_hw_encoder else None
+            if hw_encoder_args is None:
+                call_args = mp4_call_args(X264_ENCODER_ARGS)
+            else:
+                call_args = mp4_call_args(hw_encoder_args)
+
+                # GPU encoders have resolution & pixel format limits a test encode can't catch
+                self.fallback_call_args = mp4_call_args(X264_ENCODER_ARGS)
+        elif scrshot_saver.mp4_gif_fast_palette and render_files: # GIF
+            # Palette from the first frame only, frames get encoded as they're read instead
+            # of being held until the palette of the whole sequence is done
+            first_frame_args = ['-i', f'{Path(input_path.parent, render_files[0])}']
+            if scrshot_saver.format_type == 'open_exr':
+                first_frame_args[:0] = ('-apply_trc', 'iec61966_2_1')
+
             call_args = [
-                f'{ffmpeg_path}',
+                f'{FFMPEG_PATH}',
                 '-y',
                 '-f', 'concat', '-safe', '0',
                 '-r', f'{scrshot_saver.mp4_framerate}',
                 '-i', f'{concat_file_path}',
-                '-filter_complex', f"[0:v]{crop_amt}[z];[z]{scale_amt}",
-                "-c:v", 'libx264',
-                '-preset', 'slow',
-                '-crf', '20',
-                '-pix_fmt', 'yuv420p',
+                *first_frame_args,
+                '-filter_complex', f"[0:v]{frame_filter}[z];[1:v]{frame_filter},{GIF_PALETTE_GEN}[p];[z][p]paletteuse=dither=bayer:bayer_scale=5",
+                f'{output_path}'
+            ]
+        elif self.estimate_gif_frame_bytes(scrshot_saver, input_path, render_files) > GIF_SINGLE_PASS_MAX_BYTES: # GIF
+            # Too large to queue in memory, write the palette of the whole sequence to a file first
+            self.palette_call_args = [
+                f'{FFMPEG_PATH}',
+                '-y',
+                '-f', 'concat', '-safe', '0',
+                '-r', f'{scrshot_saver.mp4_framerate}',
+                '-i', f'{concat_file_path}',
+                '-vf', f"{frame_filter},{GIF_PALETTE_GEN}",
+                '-update', '1', # A single image rather than a numbered sequence
+                f'{PALETTE_PATH}'
+            ]
+            call_args = [
+                f'{FFMPEG_PATH}',
+                '-y',
+                '-f', 'concat', '-safe', '0',
+                '-r', f'{scrshot_saver.mp4_framerate}',
+                '-i', f'{concat_file_path}',
+                '-i', f'{PALETTE_PATH}',
+                '-filter_complex', f"[0:v]{frame_filter}[x];[x][1:v]paletteuse",
                 f'{output_path}'
             ]
         else: # GIF
-            palette_file_path = self.generate_palette(concat_file_path)
-
+            # Generate the palette and apply it in the same pass, the frames are only read once
+            # but stay queued in memory until the palette is done (see GIF_SINGLE_PASS_MAX_BYTES)
             call_args = [
-                f'{ffmpeg_path}',
+                f'{FFMPEG_PATH}',
                 '-y',
                 '-f', 'concat', '-safe', '0',
                 '-r', f'{scrshot_saver.mp4_framerate}',
                 '-i', f'{concat_file_path}',
-                '-i', f'{palette_file_path}',
-                '-filter_complex', f"[0:v]{crop_amt}[z];[z]{scale_amt}[z];[z][1:v]paletteuse",
+                '-filter_complex', f"[0:v]{frame_filter},split[a][b];[a]{GIF_PALETTE_GEN}[p];[b][p]paletteuse",
                 f'{output_path}'
             ]
 
+        # Input option, has to go in front of the concat input
         if scrshot_saver.format_type == 'open_exr':
-            call_args.insert(2, '-apply_trc')
-            call_args.insert(3, 'iec61966_2_1')
-
-        try:
-            subprocess.check_output(call_args)
-        except subprocess.CalledProcessError:
-            self.report({'ERROR'}, f"An error occured, and your {scrshot_saver.mp4_format_type.upper()} was not encoded properly.\n\nPlease send a screenshot of your console to ethan.simon.3d@gmail.com")
+            call_args[2:2] = ('-apply_trc', 'iec61966_2_1')
+            if self.fallback_call_args is not None:
+                self.fallback_call_args[2:2] = ('-apply_trc', 'iec61966_2_1')
+            if self.palette_call_args is not None:
+                self.palette_call_args[2:2] = ('-apply_trc', 'iec61966_2_1')
+
+        self.call_args = call_args
+        self.output_path = output_path
+        self.format_name = scrshot_saver.mp4_format_type.upper()
+        return True
+
+    def end_encode(self, returncode: int) -> set:
+        '''Clean up and report how the ffmpeg encode went'''
+        # Only needed for the run that wrote them, don't leave them lying around
+        CONCAT_PATH.unlink(missing_ok=True)
+        PALETTE_PATH.unlink(missing_ok=True)
+
+        if returncode or not self.output_path.is_file():
+            self.report({'ERROR'}, f"An error occured, and your {self.format_name} was not encoded properly.\n\nPlease send a screenshot of your console to ethan.simon.3d@gmail.com")
             return {'CANCELLED'}
 
-        if output_path.is_file():
-            self.report({'INFO'}, f"{scrshot_saver.mp4_format_type.upper()} Generated!")
-        else:
-            self.report({'ERROR'}, f"An error occured, and your {scrshot_saver.mp4_format_type.upper()} was not encoded properly.\n\nPlease send a screenshot of your console to ethan.simon.3d@gmail.com")
+        self.report({'INFO'}, f"{self.format_name} Generated!")
         return {'FINISHED'}
 
+    def execute(self, context):
+        if not self.begin_encode(context):
+            return {'CANCELLED'}
+
+        # ffmpeg's log still goes to the console (stderr), its stdout isn't needed
+        if self.palette_call_args is not None:
+            returncode = subprocess.call(self.palette_call_args, stdout=subprocess.DEVNULL)
+            if returncode:
+                return self.end_encode(returncode)
+
+        returncode = subprocess.call(self.call_args, stdout=subprocess.DEVNULL)
+        if returncode and self.fallback_call_args is not None:
+            returncode = subprocess.call(self.fallback_call_args, stdout=subprocess.DEVNULL)
+        return self.end_encode(returncode)
+
+    def modal(self, context, event):
+        # Blender stays usable while encoding, only check in on ffmpeg every timer tick
+        if event.type != 'TIMER' or self.process.poll() is None:
+            return {'PASS_THROUGH'}
+
+        # Palette written, encode the GIF with it
+        if self.palette_call_args is not None:
+            self.palette_call_args = None
+            if not self.process.returncode:
+                self.process = subprocess.Popen(self.call_args, stdout=subprocess.DEVNULL)
+                return {'PASS_THROUGH'}
+
+        # The GPU encoder couldn't handle this sequence, redo it on the CPU
+        if self.process.returncode and self.fallback_call_args is not None:
+            self.process = subprocess.Popen(self.fallback_call_args, stdout=subprocess.DEVNULL)
+            self.fallback_call_args = None
+
+            self.report({'WARNING'}, f"GPU encoding failed, encoding {self.format_name} with the CPU...")
+            return {'PASS_THROUGH'}
+
+        context.window_manager.event_timer_remove(self.timer)
+        SCRSHOT_OT_generate_mp4.encoding = False
+        return self.end_encode(self.process.returncode)
+
+    def cancel(self, context):
+        # Blender is dropping the operator (file load, quitting), don't leave ffmpeg writing in the background
+        context.window_manager.event_timer_remove(self.timer)
+        if self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
+        CONCAT_PATH.unlink(missing_ok=True)
+        PALETTE_PATH.unlink(missing_ok=True)
+        SCRSHOT_OT_generate_mp4.encoding = False
+
+    def invoke(self, context, event):
+        if not self.begin_encode(context):
+            return {'CANCELLED'}
+
+        # Large GIFs start with writing their palette, modal runs the encode after it
+        self.process = subprocess.Popen(self.palette_call_args or self.call_args, stdout=subprocess.DEVNULL)
+        SCRSHOT_OT_generate_mp4.encoding = True
+
+        self.report({'INFO'}, f"Encoding {self.format_name}...")
+
+        wm = context.window_manager
+        self.timer = wm.event_timer_add(.25, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
 
 ################################################################################################################
 # REGISTRATION
@@ -1,6 +1,6 @@
 import bpy, os
 from bpy.props import *
-from .operators import display_error_message
+from .operators import display_error_message, invalidate_export_path_cache, start_hw_encoder_probe
 
 
 ############################################################
@@ -12,9 +12,16 @@ class SCRSHOT_property_group(bpy.types.PropertyGroup):
     ### UPDATE FUNCTIONS ###
 
     def update_export_path(self, context) -> None:
+        invalidate_export_path_cache()
+
         if self.export_path != '//screenshots' and not os.path.exists(bpy.path.abspath(self.export_path)):
             self.export_path = '//screenshots'
 
+    def update_use_hw_encoder(self, context) -> None:
+        # Test the GPU encoders now, the result is usually ready by the time an MP4 gets generated
+        if self.mp4_use_hw_encoder:
+            start_hw_encoder_probe()
+
     ### PROPERTIES ###
 
     export_path: StringProperty(name="", default="//screenshots", description="", subtype='DIR_PATH', update=update_export_path)
@@ -63,6 +70,17 @@ class SCRSHOT_property_group(bpy.types.PropertyGroup):
         description='Downscale the video output for smaller file sizes'
     )
 
+    mp4_use_hw_encoder: BoolProperty(
+        name='GPU Encoding',
+        description='Encode MP4s with the GPU (NVENC, Quick Sync or AMF). The first encoder that works on this machine is used. The CPU (x264) is used if none of them do, while they are still being tested, or if the GPU fails on the sequence',
+        update=update_use_hw_encoder
+    )
+
+    mp4_gif_fast_palette: BoolProperty(
+        name='Fast Palette',
+        description='Build the GIF color palette from the first frame only, in a single fast pass with low memory use. Colors that only show up in later frames can band. Otherwise the palette covers every frame, made in the same pass (holding all frames in memory) for smaller sequences and in a separate pass that reads the frames twice for long or high resolution ones'
+    )
+
     mp4_end_repeat_count: IntProperty(
         name='End Repeat',
         description='How many times the end frame repeats',
@@ -377,6 +395,16 @@ class SCRSHOT_collection_property(bpy.types.PropertyGroup):
     studio_rotate_z: FloatProperty(name='Rotation', min=-3.14159265359, max=3.14159265359, subtype='ANGLE')
 
 
+# Settings that get copied/pasted between screenshot items, worked out once instead of on every copy
+#
+# Datablock pointers are skipped, and a handful of internal keys are ignored manually
+SCRSHOT_collection_property.copy_keys = tuple(
+    key for key, prop in SCRSHOT_collection_property.__annotations__.items()
+    if prop.function in {StringProperty, IntProperty, BoolProperty, EnumProperty, FloatProperty, FloatVectorProperty}
+    and key not in {'id', 'name', 'saved_name', 'enabled', 'subfolder_name'}
+)
+
+
 ##################################
 # REGISTRATION
 ##################################
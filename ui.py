@@ -414,6 +414,11 @@ class SCRSHOT_PT_convert_ui(PanelInfo, Panel):
         split.label(text='Scale')
         split.prop(scrshot_saver, 'mp4_res_downscale', text='')
 
+        if scrshot_saver.mp4_format_type == 'mp4':
+            layout.prop(scrshot_saver, 'mp4_use_hw_encoder')
+        else: # GIF
+            layout.prop(scrshot_saver, 'mp4_gif_fast_palette')
+
 
 ################################################################################################################
 # REGISTRATION